@@ -1,6 +1,7 @@
 import sqlite3
 import random
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 
 # Create a connection to the SQLite database
@@ -110,22 +111,22 @@ for student in students:
     ''', student)
 
 # Generate occupancy data
-cursor.execute("SELECT room_id FROM rooms")
-room_ids = [row[0] for row in cursor.fetchall()]
+cursor.execute("SELECT room_id, capacity FROM rooms")
+room_rows = cursor.fetchall()
+room_ids = [rid for rid, _ in room_rows]
 
 cursor.execute("SELECT student_id, status FROM students")
 student_data = cursor.fetchall()
 
 current_date = datetime.now()
 occupancy_records = []
-room_occupancy = {rid: 0 for rid in room_ids}
-
-for student_id, status in student_data:
-    available = [rid for rid, cnt in room_occupancy.items() if cnt < 4]
-    if not available:
-        break
-    rid = random.choice(available)
-    room_occupancy[rid] += 1
+
+# One shuffled slot per bed (each room repeated capacity times); zip stops once beds run out
+bed_slots = np.random.default_rng().permutation(
+    np.repeat([rid for rid, _ in room_rows], [cap for _, cap in room_rows])
+)
+
+for (student_id, status), rid in zip(student_data, bed_slots.tolist()):
     days_ago = random.randint(30, 180)
     check_in = (current_date - timedelta(days=days_ago)).strftime('%Y-%m-%d')
     check_out = None
@@ -1,23 +1,27 @@
 import sqlite3
-from sklearn.linear_model import LinearRegression
 import numpy as np
 import os
+import re
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import List, Dict, Any, AsyncIterator
+from typing import List, Dict, Any, AsyncIterator, Tuple
 
 from mcp.server.fastmcp import FastMCP, Context
 
+# query_database guards: forbidden statements anywhere, and SELECT as the first word
+_FORBIDDEN_RE = re.compile(r"\b(?:DROP|DELETE|UPDATE|INSERT|ALTER|CREATE|ATTACH|PRAGMA)\b", re.IGNORECASE)
+_SELECT_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+
 # Database connection helper
 @dataclass
 class DatabaseConnection:
     db_path: str = "dormitory.db"
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
+    def execute_query(self, query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         try:
-            cur.execute(query)
+            cur.execute(query, params)
             rows = [dict(r) for r in cur.fetchall()]
         except sqlite3.Error as e:
             rows = [{"error": str(e)}]
@@ -37,6 +41,9 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[DatabaseConnection]:
 
 mcp = FastMCP("Dormitory Management System", lifespan=app_lifespan)
 
+# (slope, intercept) of the occupancy trend, keyed by the monthly counts it was fitted on
+_trend_cache: Dict[bytes, Tuple[float, float]] = {}
+
 # Resources
 @mcp.resource("schema://dormitory")
 def get_schema(ctx: Context) -> str:
@@ -97,10 +104,9 @@ def get_maintenance(ctx: Context) -> str:
 # Tools
 @mcp.tool()
 def query_database(ctx: Context, sql_query: str) -> str:
-    forbidden = ["DROP", "DELETE", "UPDATE", "INSERT", "ALTER", "CREATE"]
-    if any(k in sql_query.upper() for k in forbidden):
+    if _FORBIDDEN_RE.search(sql_query):
         return "Error: Only SELECT queries are allowed."
-    if not sql_query.strip().upper().startswith("SELECT"):
+    if not _SELECT_RE.match(sql_query):
         return "Error: Only SELECT queries are allowed."
     db = ctx.request_context.lifespan_context
     rows = db.execute_query(sql_query)
@@ -109,26 +115,24 @@ def query_database(ctx: Context, sql_query: str) -> str:
     if "error" in rows[0]:
         return f"Error: {rows[0]['error']}"
     # Format as table
-    keys = rows[0].keys()
-    header = " | ".join(keys)
-    sep = "-" * len(header)
-    lines = [header, sep]
-    for r in rows:
-        lines.append(" | ".join(str(r[k]) for k in keys))
+    header = " | ".join(rows[0])
+    lines = [header, "-" * len(header)]
+    lines.extend(" | ".join(map(str, r.values())) for r in rows)
     return "\n".join(lines)
 
 @mcp.tool()
 def find_student(ctx: Context, search_term: str) -> str:
     db = ctx.request_context.lifespan_context
-    rows = db.execute_query(f"""
+    pattern = f"%{search_term}%"
+    rows = db.execute_query("""
         SELECT s.*, r.floor, r.room_number
         FROM students s
         LEFT JOIN occupancy o 
           ON s.student_id = o.student_id AND o.check_out_date IS NULL
         LEFT JOIN rooms r ON o.room_id = r.room_id
-        WHERE s.student_id LIKE '%{search_term}%' 
-           OR s.name LIKE '%{search_term}%'
-    """)
+        WHERE s.student_id LIKE ? 
+           OR s.name LIKE ?
+    """, (pattern, pattern))
     if not rows:
         return f"No students found matching '{search_term}'."
     out = []
@@ -149,15 +153,15 @@ def find_student(ctx: Context, search_term: str) -> str:
 @mcp.tool()
 def room_occupants(ctx: Context, floor: int, room_number: str) -> str:
     db = ctx.request_context.lifespan_context
-    rows = db.execute_query(f"""
+    rows = db.execute_query("""
         SELECT s.student_id, s.name, s.program, o.check_in_date
         FROM students s
         JOIN occupancy o ON s.student_id = o.student_id
         JOIN rooms r ON o.room_id = r.room_id
-        WHERE r.floor = {floor} 
-          AND r.room_number = '{room_number}'
+        WHERE r.floor = ? 
+          AND r.room_number = ?
           AND o.check_out_date IS NULL
-    """)
+    """, (floor, room_number))
     if not rows:
         return f"No current occupants found for Room {room_number} on Floor {floor}."
     lines = [f"Occupants of Room {room_number} (Floor {floor}):", "-"*40]
@@ -175,27 +179,26 @@ def check_availability(ctx: Context) -> str:
     db = ctx.request_context.lifespan_context
     rows = db.execute_query("""
         SELECT r.floor, r.room_number, r.capacity,
-               (SELECT COUNT(*) FROM occupancy o 
-                 WHERE o.room_id = r.room_id 
-                   AND o.check_out_date IS NULL) AS occupied,
-               r.capacity - 
-               (SELECT COUNT(*) FROM occupancy o 
-                 WHERE o.room_id = r.room_id 
-                   AND o.check_out_date IS NULL) AS available
+               COUNT(o.occupancy_id) AS occupied,
+               r.capacity - COUNT(o.occupancy_id) AS available
         FROM rooms r
+        LEFT JOIN occupancy o
+          ON o.room_id = r.room_id AND o.check_out_date IS NULL
+        GROUP BY r.room_id
         ORDER BY r.floor, r.room_number
     """)
     lines = ["Room Availability:"]
-    for f in range(1, 4):
-        lines.append(f"\nFloor {f}:")
-        lines.append("-"*40)
-        for r in rows:
-            if r['floor'] == f:
-                status = "FULL" if r['available'] == 0 else f"{r['available']} beds available"
-                lines.append(
-                    f"Room {r['room_number']}: "
-                    f"{r['occupied']}/{r['capacity']} occupied - {status}"
-                )
+    floor = None
+    for r in rows:
+        if r['floor'] != floor:
+            floor = r['floor']
+            lines.append(f"\nFloor {floor}:")
+            lines.append("-"*40)
+        status = "FULL" if r['available'] == 0 else f"{r['available']} beds available"
+        lines.append(
+            f"Room {r['room_number']}: "
+            f"{r['occupied']}/{r['capacity']} occupied - {status}"
+        )
     return "\n".join(lines)
 
 @mcp.tool()
@@ -210,11 +213,13 @@ def predict_occupancy(ctx: Context, months_ahead: int) -> str:
     """)
     if not rows or len(rows) < 2:
         return "Not enough historical data."
-    y = np.array([r['num'] for r in rows])
-    X = np.arange(len(y)).reshape(-1, 1)
-    model = LinearRegression().fit(X, y)
-    future_X = np.arange(len(y), len(y)+months_ahead).reshape(-1, 1)
-    preds = model.predict(future_X).astype(int)
+    y = np.array([r['num'] for r in rows], dtype=float)
+    key = y.tobytes()
+    if key not in _trend_cache:
+        _trend_cache[key] = tuple(np.polyfit(np.arange(len(y)), y, 1))
+    slope, intercept = _trend_cache[key]
+    future = np.arange(len(y), len(y) + months_ahead)
+    preds = (slope * future + intercept).astype(int)
     return "\n".join(f"Month +{i+1}: {p} residents" for i, p in enumerate(preds))
 
 @mcp.tool()
@@ -3,7 +3,8 @@ import os
 import sys
 import sqlite3
 import requests
-from typing import List, Optional
+from collections import deque
+from typing import Any, Dict, List, Optional
 
 from sentence_transformers import SentenceTransformer
 import chromadb
@@ -13,25 +14,34 @@ from mcp import ClientSession
 # Initialize embedding model
 embedder = SentenceTransformer('all-MiniLM-L6-v2')
 
-# Set up ChromaDB and collections
+# Set up ChromaDB
 chroma_client = chromadb.Client()
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="all-MiniLM-L6-v2"
-)
-students_collection = chroma_client.get_or_create_collection(
-    name="students_data", embedding_function=embedding_function
-)
-rooms_collection = chroma_client.get_or_create_collection(
-    name="rooms_data", embedding_function=embedding_function
-)
-occupancy_collection = chroma_client.get_or_create_collection(
-    name="occupancy_data", embedding_function=embedding_function
-)
-maintenance_collection = chroma_client.get_or_create_collection(
-    name="maintenance_data", embedding_function=embedding_function
-)
-schema_collection = chroma_client.get_or_create_collection(
-    name="schema_data", embedding_function=embedding_function
+@embedding_functions.register_embedding_function
+class SharedEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """Chroma embedding function that reuses the module-level embedder"""
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input):
+        return embedder.encode(
+            list(input), convert_to_numpy=True, normalize_embeddings=True
+        ).tolist()
+
+    @staticmethod
+    def name() -> str:
+        return "dorm_shared_minilm"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "SharedEmbeddingFunction":
+        return SharedEmbeddingFunction()
+
+embedding_function = SharedEmbeddingFunction()
+# One collection for every table; the "type" metadata tag tells documents apart
+dorm_collection = chroma_client.get_or_create_collection(
+    name="dorm", embedding_function=embedding_function
 )
 
 class DormitoryRAG:
@@ -56,8 +66,12 @@ class DormitoryRAG:
             print(f"Failed to initialize MCP session: {e}")
             sys.exit(1)
 
-        self.conversation_history: List[dict] = []
         self.max_history_length = 10
+        # Oldest turns fall off on append once max_history_length exchanges are stored
+        self.conversation_history: deque = deque(maxlen=self.max_history_length * 2)
+
+        # Collection size only changes in initialize_database, so queries read this instead of count()
+        self._collection_count = dorm_collection.count()
 
     def initialize_database(self) -> None:
         print("Initializing database and loading into vector store...")
@@ -65,15 +79,16 @@ class DormitoryRAG:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
+        # Documents from every table, embedded together and added in one call at the end
+        all_docs, all_ids, all_metas = [], [], []
+
         # Load schema
         cursor.execute("SELECT sql FROM sqlite_master WHERE type='table'")
         schema_texts = [row['sql'] for row in cursor.fetchall() if row['sql']]
         if schema_texts:
-            schema_collection.add(
-                documents=schema_texts,
-                ids=[f"schema_{i}" for i in range(len(schema_texts))],
-                metadatas=[{"type": "schema"} for _ in schema_texts]
-            )
+            all_docs.extend(schema_texts)
+            all_ids.extend(f"schema_{i}" for i in range(len(schema_texts)))
+            all_metas.extend({"type": "schema"} for _ in schema_texts)
 
         # Load students
         cursor.execute("SELECT * FROM students")
@@ -89,7 +104,9 @@ class DormitoryRAG:
                 docs.append(text)
                 ids.append(f"student_{d['student_id']}")
                 metas.append({"type": "student", "id": d['student_id']})
-            students_collection.add(documents=docs, ids=ids, metadatas=metas)
+            all_docs.extend(docs)
+            all_ids.extend(ids)
+            all_metas.extend(metas)
 
         # Load rooms
         cursor.execute("SELECT * FROM rooms")
@@ -105,7 +122,9 @@ class DormitoryRAG:
                 docs.append(text)
                 ids.append(f"room_{d['room_id']}")
                 metas.append({"type": "room", "id": d['room_id']})
-            rooms_collection.add(documents=docs, ids=ids, metadatas=metas)
+            all_docs.extend(docs)
+            all_ids.extend(ids)
+            all_metas.extend(metas)
 
         # Load occupancy
         cursor.execute("""
@@ -132,7 +151,9 @@ class DormitoryRAG:
                 docs.append(text)
                 ids.append(f"occupancy_{d['occupancy_id']}")
                 metas.append({"type": "occupancy", "id": d['occupancy_id']})
-            occupancy_collection.add(documents=docs, ids=ids, metadatas=metas)
+            all_docs.extend(docs)
+            all_ids.extend(ids)
+            all_metas.extend(metas)
 
         # Load maintenance
         cursor.execute("""
@@ -158,9 +179,27 @@ class DormitoryRAG:
                 docs.append(text)
                 ids.append(f"maintenance_{d['request_id']}")
                 metas.append({"type": "maintenance", "id": d['request_id']})
-            maintenance_collection.add(documents=docs, ids=ids, metadatas=metas)
+            all_docs.extend(docs)
+            all_ids.extend(ids)
+            all_metas.extend(metas)
 
         conn.close()
+
+        # One batched encode for every document
+        if all_docs:
+            vecs = embedder.encode(
+                all_docs,
+                batch_size=64,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+            dorm_collection.add(
+                documents=all_docs, ids=all_ids, metadatas=all_metas,
+                embeddings=vecs.tolist()
+            )
+        self._collection_count = dorm_collection.count()
+
         print("Database loaded into vector store successfully!")
 
     def query_ollama(self, prompt: str, context: Optional[str] = None) -> str:
@@ -168,10 +207,13 @@ class DormitoryRAG:
         if context:
             system_msg += "\n\nContext information:\n" + context
 
-        if len(self.conversation_history) >= self.max_history_length * 2:
-            self.conversation_history = self.conversation_history[2:]
+        # Evict the oldest whole exchange first; letting the bounded deque drop only its user
+        # message would leave an orphan assistant reply right after the system prompt
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            self.conversation_history.popleft()
+            self.conversation_history.popleft()
         self.conversation_history.append({"role": "user", "content": prompt})
-        messages = [{"role": "system", "content": system_msg}] + self.conversation_history
+        messages = [{"role": "system", "content": system_msg}] + list(self.conversation_history)
 
         payload = {"model": self.model, "messages": messages, "stream": False}
         try:
@@ -182,24 +224,21 @@ class DormitoryRAG:
             self.conversation_history.append({"role": "assistant", "content": reply})
             return reply
         except Exception as e:
+            # Drop the unanswered turn so the history keeps whole user/assistant pairs
+            self.conversation_history.pop()
             return f"Error querying Ollama: {e}"
 
     def query_vector_store(self, query: str, k: int = 5) -> List[str]:
-        results: List[str] = []
-        for col in [
-            students_collection,
-            rooms_collection,
-            occupancy_collection,
-            maintenance_collection,
-            schema_collection,
-        ]:
-            try:
-                res = col.query(query_texts=[query], n_results=min(k, col.count()))
-                docs = res.get("documents", [[]])[0]
-                results.extend(docs)
-            except Exception:
-                pass
-        return results[:k]
+        n_results = min(k, self._collection_count)
+        if n_results == 0:
+            return []
+        # Embed the query ourselves so the search gets a ready vector
+        qv = embedder.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0].tolist()
+        try:
+            res = dorm_collection.query(query_embeddings=[qv], n_results=n_results)
+            return res.get("documents", [[]])[0]
+        except Exception:
+            return []
 
     def run_cli(self):
         print("=== Dormitory RAG System ===")
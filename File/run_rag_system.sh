@@ -21,7 +21,7 @@ if [ ! -d "venv" ]; then
 fi
 source venv/bin/activate
 pip install --upgrade pip
-pip install mcp-api langchain sentence-transformers fastmcp chromadb pandas requests scikit-learn
+pip install mcp-api langchain sentence-transformers fastmcp chromadb pandas numpy requests
 
 # 2) Ollama configuration
 #    Before running, you can override these:
@@ -40,8 +40,17 @@ if [[ "$OLLAMA_URL" == http://localhost* ]]; then
   # Start local Ollama if not already
   if ! curl -s "$OLLAMA_URL/api/version" &> /dev/null; then
     echo -e "${YELLOW}Starting local Ollama service...${NC}"
-    ollama serve &
-    sleep 5
+    # Log to a file rather than the terminal so server output does not interleave with the chat
+    ollama serve > ollama.log 2>&1 &
+    # Wait until the API answers (up to 30 seconds) instead of a fixed delay
+    for _ in $(seq 1 60); do
+      curl -s "$OLLAMA_URL/api/version" &> /dev/null && break
+      sleep 0.5
+    done
+    if ! curl -s "$OLLAMA_URL/api/version" &> /dev/null; then
+      echo -e "${RED}Error: Ollama did not start. See ollama.log for details.${NC}"
+      exit 1
+    fi
   fi
   # Pull model if missing
   if ! ollama list | grep -q "$MODEL"; then
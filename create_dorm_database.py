@@ -1,24 +1,33 @@
 import sqlite3
-import random
-from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 
 # Create a connection to the SQLite database
-conn = sqlite3.connect('dormitory.db')
+# isolation_level=None leaves transaction control to the explicit BEGIN/COMMIT below
+conn = sqlite3.connect('dormitory.db', isolation_level=None)
+conn.executescript("""
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+""")
 cursor = conn.cursor()
 
-# Create tables
-cursor.execute('''
+# Random generator used to draw each sample data column in one vectorized call.
+# The fixed seed makes every run produce the same sample database.
+rng = np.random.default_rng(0)
+
+# Create tables and indexes in one script
+SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS rooms (
     room_id INTEGER PRIMARY KEY,
     floor INTEGER NOT NULL,
     room_number TEXT NOT NULL,
     capacity INTEGER DEFAULT 4,
     UNIQUE(floor, room_number)
-)
-''')
+);
 
-cursor.execute('''
 CREATE TABLE IF NOT EXISTS students (
     student_id TEXT PRIMARY KEY,
     name TEXT NOT NULL,
@@ -27,10 +36,8 @@ CREATE TABLE IF NOT EXISTS students (
     contact_number TEXT,
     emergency_contact TEXT,
     status TEXT NOT NULL
-)
-''')
+);
 
-cursor.execute('''
 CREATE TABLE IF NOT EXISTS occupancy (
     occupancy_id INTEGER PRIMARY KEY,
     student_id TEXT NOT NULL,
@@ -39,10 +46,8 @@ CREATE TABLE IF NOT EXISTS occupancy (
     check_out_date DATE,
     FOREIGN KEY (student_id) REFERENCES students(student_id),
     FOREIGN KEY (room_id) REFERENCES rooms(room_id)
-)
-''')
+);
 
-cursor.execute('''
 CREATE TABLE IF NOT EXISTS maintenance (
     request_id INTEGER PRIMARY KEY,
     room_id INTEGER NOT NULL,
@@ -51,8 +56,34 @@ CREATE TABLE IF NOT EXISTS maintenance (
     status TEXT NOT NULL,
     resolved_date DATE,
     FOREIGN KEY (room_id) REFERENCES rooms(room_id)
-)
-''')
+);
+
+-- Trigram index over student IDs and names so find_student's substring search (e.g. "2023001"
+-- inside "STU2023001") goes through the index; it reads its rows from the students table and
+-- is rebuilt once the sample data is inserted. Dropped first so re-running the script replaces
+-- an index built with an older tokenizer
+DROP TABLE IF EXISTS students_fts;
+CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+    student_id, name,
+    content='students', content_rowid='rowid',
+    tokenize='trigram'
+);
+
+-- Indexes for the MCP server's hot lookups (active occupancy, joins, latest maintenance)
+CREATE INDEX IF NOT EXISTS idx_occ_room_active ON occupancy(room_id) WHERE check_out_date IS NULL;
+CREATE INDEX IF NOT EXISTS idx_occ_student_active ON occupancy(student_id) WHERE check_out_date IS NULL;
+CREATE INDEX IF NOT EXISTS idx_maint_room ON maintenance(room_id);
+CREATE INDEX IF NOT EXISTS idx_maint_reported ON maintenance(reported_date DESC);
+CREATE INDEX IF NOT EXISTS idx_students_name ON students(name COLLATE NOCASE);
+-- Full (non-partial) occupancy indexes for ad-hoc query_database SQL over past stays,
+-- e.g. check-outs in a date range or a student's full residence history
+CREATE INDEX IF NOT EXISTS idx_occ_room_checkout ON occupancy(room_id, check_out_date);
+CREATE INDEX IF NOT EXISTS idx_occ_student ON occupancy(student_id);
+"""
+conn.executescript(SCHEMA_SQL)
+
+# Insert all sample data in a single transaction so the final commit flushes once
+cursor.execute("BEGIN")
 
 # Generate room data (3 floors, 5 rooms per floor)
 rooms = []
@@ -62,11 +93,10 @@ for floor in range(1, 4):
         rooms.append((floor, room_number, 4))
 
 # Insert room data
-for floor, room_number, capacity in rooms:
-    cursor.execute('''
-    INSERT OR IGNORE INTO rooms (floor, room_number, capacity)
-    VALUES (?, ?, ?)
-    ''', (floor, room_number, capacity))
+cursor.executemany('''
+INSERT OR IGNORE INTO rooms (floor, room_number, capacity)
+VALUES (?, ?, ?)
+''', rooms)
 
 # Generate student data
 programs = ["Computer Science", "Engineering", "Business", "Medicine", "Arts", "Biology", "Physics", "Chemistry", "Mathematics", "Psychology"]
@@ -85,70 +115,77 @@ last_names = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Mille
               "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores"]
 
 # Generate 40 students
-students = []
-for i in range(1, 41):
-    student_id = f"STU{2023000 + i}"
-    name = f"{random.choice(first_names)} {random.choice(last_names)}"
-    gender = random.choice(genders)
-    program = random.choice(programs)
-    contact_number = f"+1-555-{random.randint(1000, 9999)}"
-    emergency_contact = f"+1-555-{random.randint(1000, 9999)}"
-    
+num_students = 40
+first = rng.choice(first_names, size=num_students)
+last = rng.choice(last_names, size=num_students)
+student_genders = rng.choice(genders, size=num_students)
+student_programs = rng.choice(programs, size=num_students)
+contacts = rng.integers(1000, 10000, size=num_students)
+emergency_contacts = rng.integers(1000, 10000, size=num_students)
+
+students = zip(
+    (f"STU{2023000 + i}" for i in range(1, num_students + 1)),
+    (f"{a} {b}" for a, b in zip(first.tolist(), last.tolist())),
+    student_genders.tolist(),
+    student_programs.tolist(),
+    (f"+1-555-{n}" for n in contacts.tolist()),
+    (f"+1-555-{n}" for n in emergency_contacts.tolist()),
     # Make 30% of students "Checked Out"
-    status = "Checked Out" if i <= 12 else "Active"
-    
-    students.append((student_id, name, gender, program, contact_number, emergency_contact, status))
+    ("Checked Out" if i <= 12 else "Active" for i in range(1, num_students + 1))
+)
 
 # Insert student data
-for student in students:
-    cursor.execute('''
-    INSERT OR IGNORE INTO students (student_id, name, gender, program, contact_number, emergency_contact, status)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', student)
+cursor.executemany('''
+INSERT OR IGNORE INTO students (student_id, name, gender, program, contact_number, emergency_contact, status)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+''', students)
 
 # Generate occupancy data
-# Get room IDs
-cursor.execute("SELECT room_id FROM rooms")
-room_ids = [row[0] for row in cursor.fetchall()]
+# Get room IDs and bed counts as parallel arrays
+cursor.execute("SELECT room_id, capacity FROM rooms")
+room_ids, room_capacities = (list(col) for col in zip(*cursor.fetchall()))
 
 # Get student IDs
 cursor.execute("SELECT student_id, status FROM students")
 student_data = cursor.fetchall()
 
 # Current date for reference
-current_date = datetime.now()
-
-# Generate occupancy records
-occupancy_records = []
-room_occupancy = {room_id: 0 for room_id in room_ids}
-
-for student_id, status in student_data:
-    # Randomly select a room that's not full
-    available_rooms = [room_id for room_id, count in room_occupancy.items() if count < 4]
-    if not available_rooms:
-        break
-    
-    room_id = random.choice(available_rooms)
-    room_occupancy[room_id] += 1
-    
-    # Random check-in date (1-6 months ago)
-    days_ago = random.randint(30, 180)
-    check_in_date = (current_date - timedelta(days=days_ago)).strftime('%Y-%m-%d')
-    
-    # Check-out date if status is "Checked Out"
-    check_out_date = None
-    if status == "Checked Out":
-        days_after_checkin = random.randint(30, days_ago)
-        check_out_date = (current_date - timedelta(days=days_ago-days_after_checkin)).strftime('%Y-%m-%d')
-    
-    occupancy_records.append((student_id, room_id, check_in_date, check_out_date))
+today = np.datetime64('today', 'D')
+
+def days_ago_to_dates(days_ago):
+    """Convert an array of day offsets into 'YYYY-MM-DD' strings counted back from today"""
+    return (today - days_ago.astype('timedelta64[D]')).astype(str)
+
+# Random check-in date (1-6 months ago) and stay length for every student
+checkin_days_ago = rng.integers(30, 181, size=len(student_data))
+days_after_checkin = rng.integers(30, checkin_days_ago + 1)
+
+# Check-in dates for everyone; check-out dates only for "Checked Out" students
+checked_out = np.array([status for _, status in student_data]) == "Checked Out"
+check_in_dates = days_ago_to_dates(checkin_days_ago)
+check_out_dates = np.where(
+    checked_out,
+    days_ago_to_dates(checkin_days_ago - days_after_checkin),
+    None
+)
+
+# Assign rooms by shuffling every bed slot (each room repeated once per bed) and handing
+# them out in order; zip stops early if there are more students than beds
+bed_slots = np.repeat(np.array(room_ids), room_capacities)
+rng.shuffle(bed_slots)
+
+occupancy_records = zip(
+    (student_id for student_id, _ in student_data),
+    bed_slots.tolist(),
+    check_in_dates.tolist(),
+    check_out_dates.tolist()
+)
 
 # Insert occupancy data
-for student_id, room_id, check_in_date, check_out_date in occupancy_records:
-    cursor.execute('''
-    INSERT INTO occupancy (student_id, room_id, check_in_date, check_out_date)
-    VALUES (?, ?, ?, ?)
-    ''', (student_id, room_id, check_in_date, check_out_date))
+cursor.executemany('''
+INSERT INTO occupancy (student_id, room_id, check_in_date, check_out_date)
+VALUES (?, ?, ?, ?)
+''', occupancy_records)
 
 # Generate maintenance requests
 maintenance_issues = [
@@ -159,58 +196,62 @@ maintenance_issues = [
 
 maintenance_statuses = ["Pending", "In Progress", "Resolved"]
 
-maintenance_requests = []
-for i in range(15):  # Generate 15 maintenance requests
-    room_id = random.choice(room_ids)
-    issue = random.choice(maintenance_issues)
-    
-    # Random reported date (between 1-60 days ago)
-    days_ago = random.randint(1, 60)
-    reported_date = (current_date - timedelta(days=days_ago)).strftime('%Y-%m-%d')
-    
-    status = random.choice(maintenance_statuses)
-    
-    # Resolved date if status is "Resolved"
-    resolved_date = None
-    if status == "Resolved":
-        days_after_report = random.randint(1, min(days_ago, 14))  # Resolved within 14 days
-        resolved_date = (current_date - timedelta(days=days_ago-days_after_report)).strftime('%Y-%m-%d')
-    
-    maintenance_requests.append((room_id, issue, reported_date, status, resolved_date))
+# Generate 15 maintenance requests
+num_requests = 15
+maint_room_idx = rng.integers(0, len(room_ids), size=num_requests)
+issue_idx = rng.integers(0, len(maintenance_issues), size=num_requests)
+# Random reported date (between 1-60 days ago)
+reported_days_ago = rng.integers(1, 61, size=num_requests)
+status_idx = rng.integers(0, len(maintenance_statuses), size=num_requests)
+# Resolved within 14 days
+days_after_report = rng.integers(1, np.minimum(reported_days_ago, 14) + 1)
+reported_dates = days_ago_to_dates(reported_days_ago)
+resolved_dates = np.where(
+    status_idx == maintenance_statuses.index("Resolved"),
+    days_ago_to_dates(reported_days_ago - days_after_report),
+    None
+)
+
+# Generate maintenance requests lazily for executemany
+def generate_maintenance_requests():
+    for room_i, issue_i, status_i, reported_date, resolved_date in zip(
+        maint_room_idx.tolist(), issue_idx.tolist(), status_idx.tolist(),
+        reported_dates.tolist(), resolved_dates.tolist()
+    ):
+        yield (room_ids[room_i], maintenance_issues[issue_i], reported_date, maintenance_statuses[status_i], resolved_date)
 
 # Insert maintenance data
-for room_id, issue, reported_date, status, resolved_date in maintenance_requests:
-    cursor.execute('''
-    INSERT INTO maintenance (room_id, issue_description, reported_date, status, resolved_date)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (room_id, issue, reported_date, status, resolved_date))
+cursor.executemany('''
+INSERT INTO maintenance (room_id, issue_description, reported_date, status, resolved_date)
+VALUES (?, ?, ?, ?, ?)
+''', generate_maintenance_requests())
+
+# Index the inserted students for full-text search
+cursor.execute("INSERT INTO students_fts(students_fts) VALUES('rebuild')")
 
-# Commit changes and close connection
+# Commit changes and refresh planner statistics for the new indexes
 conn.commit()
+cursor.execute("ANALYZE")
 print("Database created successfully with sample data.")
 
 # Now let's display some basic statistics about the database
 print("\nDatabase Summary:")
 
-# Count rooms
-cursor.execute("SELECT COUNT(*) FROM rooms")
-print(f"Total Rooms: {cursor.fetchone()[0]}")
-
-# Count students
-cursor.execute("SELECT COUNT(*) FROM students")
-print(f"Total Students: {cursor.fetchone()[0]}")
-
-# Count active students
-cursor.execute("SELECT COUNT(*) FROM students WHERE status = 'Active'")
-print(f"Active Students: {cursor.fetchone()[0]}")
-
-# Count checked out students
-cursor.execute("SELECT COUNT(*) FROM students WHERE status = 'Checked Out'")
-print(f"Checked Out Students: {cursor.fetchone()[0]}")
-
-# Count maintenance requests
-cursor.execute("SELECT COUNT(*) FROM maintenance")
-print(f"Maintenance Requests: {cursor.fetchone()[0]}")
+# Gather every count in a single query (one pass over students for the status split)
+stats = pd.read_sql_query("""
+    SELECT (SELECT COUNT(*) FROM rooms) AS rooms,
+           COUNT(*) AS students,
+           SUM(status = 'Active') AS active,
+           SUM(status = 'Checked Out') AS checked_out,
+           (SELECT COUNT(*) FROM maintenance) AS maintenance
+    FROM students
+""", conn).iloc[0]
+
+print(f"Total Rooms: {stats['rooms']}")
+print(f"Total Students: {stats['students']}")
+print(f"Active Students: {stats['active']}")
+print(f"Checked Out Students: {stats['checked_out']}")
+print(f"Maintenance Requests: {stats['maintenance']}")
 
 # Show sample data from each table
 print("\nSample Data:")
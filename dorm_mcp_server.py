@@ -1,30 +1,89 @@
 import sqlite3
 import os
+import re
+import threading
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
-from typing import List, Dict, Any, AsyncIterator
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
 from mcp.server.fastmcp import FastMCP, Context
 
+# Statements query_database refuses to run, matched as whole words in a single pass
+_FORBIDDEN_RE = re.compile(r"\b(?:DROP|DELETE|UPDATE|INSERT|ALTER|CREATE|ATTACH|PRAGMA)\b", re.IGNORECASE)
+# Accepted queries must start with SELECT, after optional leading whitespace
+_SELECT_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+
+# Excludes tables that are not part of the dormitory schema: the students_fts search index's
+# tables and SQLite's own (e.g. sqlite_stat1 from ANALYZE)
+_SCHEMA_TABLES_FILTER = "name NOT LIKE 'students_fts%' AND name NOT LIKE 'sqlite_%'"
+
+def _fts_substring_query(search_term: str) -> str:
+    """Turn free text into a trigram FTS5 query matching it anywhere in a student ID or name"""
+    return '{student_id name} : "' + search_term.replace('"', '""') + '"'
+
 # Create a class to represent our database connection
 @dataclass
 class DatabaseConnection:
     db_path: str = "dormitory.db"
+    _conn: Optional[sqlite3.Connection] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
     
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
-        """Execute a SQLite query and return results as a list of dictionaries"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(query)
-            results = [dict(row) for row in cursor.fetchall()]
-        except sqlite3.Error as e:
-            results = [{"error": str(e)}]
-        finally:
-            conn.close()
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the shared connection on first use, tuned for read-heavy access"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA mmap_size=268435456;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-65536;
+                PRAGMA busy_timeout=5000;
+            """)
+            self._conn = conn
+        return self._conn
+    
+    def open(self) -> None:
+        """Open the shared connection up front instead of on the first query"""
+        with self._lock:
+            self._get_connection()
+    
+    def execute_query(self, query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        """Execute a SQLite query with bound parameters and return results as a list of dictionaries"""
+        with self._lock:
+            cursor = self._get_connection().cursor()
+            
+            try:
+                cursor.execute(query, params)
+                results = [dict(row) for row in cursor.fetchall()]
+            except sqlite3.Error as e:
+                results = [{"error": str(e)}]
+            finally:
+                cursor.close()
         
         return results
+    
+    def iter_query_tuples(self, query: str, params: Tuple = ()) -> Iterator[Tuple]:
+        """Execute a SQLite query and yield raw row tuples as SQLite steps through them
+        
+        The connection stays locked until the iterator is exhausted or closed.
+        """
+        with self._lock:
+            cursor = self._get_connection().cursor()
+            cursor.row_factory = None
+            
+            try:
+                cursor.execute(query, params)
+                yield from cursor
+            finally:
+                cursor.close()
+    
+    def close(self) -> None:
+        """Close the shared connection if it has been opened"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
 
 # Set up lifespan context manager
 @asynccontextmanager
@@ -32,9 +91,11 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[DatabaseConnection]:
     """Manage application lifecycle with database connection"""
     print("Starting MCP server for Dormitory Management System...")
     db = DatabaseConnection()
+    db.open()
     try:
         yield db
     finally:
+        db.close()
         print("Shutting down MCP server...")
 
 # Initialize FastMCP server
@@ -45,65 +106,65 @@ mcp = FastMCP("Dormitory Management System", lifespan=app_lifespan)
 def get_schema(ctx: Context) -> str:
     """Provide the dormitory database schema as a resource"""
     db = ctx.request_context.lifespan_context
-    schema = db.execute_query("SELECT sql FROM sqlite_master WHERE type='table'")
+    schema = db.execute_query(f"SELECT sql FROM sqlite_master WHERE type='table' AND {_SCHEMA_TABLES_FILTER}")
     return "\n\n".join(item["sql"] for item in schema if item.get("sql"))
 
 @mcp.resource("data://students")
 def get_students(ctx: Context) -> str:
     """List all students in the dormitory system"""
     db = ctx.request_context.lifespan_context
-    students = db.execute_query("SELECT * FROM students")
-    return "\n".join(f"ID: {s['student_id']}, Name: {s['name']}, Status: {s['status']}" for s in students)
+    students = db.iter_query_tuples("""
+        SELECT printf('ID: %s, Name: %s, Status: %s', student_id, name, status)
+        FROM students
+    """)
+    return "\n".join(line for (line,) in students)
 
 @mcp.resource("data://rooms")
 def get_rooms(ctx: Context) -> str:
     """List all rooms in the dormitory"""
     db = ctx.request_context.lifespan_context
-    rooms = db.execute_query("SELECT * FROM rooms")
-    return "\n".join(f"Room: {r['room_number']} (Floor {r['floor']}), Capacity: {r['capacity']}" for r in rooms)
+    rooms = db.iter_query_tuples("""
+        SELECT printf('Room: %s (Floor %s), Capacity: %s', room_number, floor, capacity)
+        FROM rooms
+    """)
+    return "\n".join(line for (line,) in rooms)
 
 @mcp.resource("data://occupancy")
 def get_occupancy(ctx: Context) -> str:
     """Get current dormitory occupancy information"""
     db = ctx.request_context.lifespan_context
-    occupancy = db.execute_query("""
-        SELECT r.floor, r.room_number, COUNT(o.student_id) as occupied, r.capacity
+    occupancy = db.iter_query_tuples("""
+        SELECT printf('Room %s (Floor %s): %d/%s occupied', r.room_number, r.floor,
+                      (SELECT COUNT(*) FROM occupancy o
+                       WHERE o.room_id = r.room_id AND o.check_out_date IS NULL),
+                      r.capacity)
         FROM rooms r
-        LEFT JOIN occupancy o ON r.room_id = o.room_id AND o.check_out_date IS NULL
-        GROUP BY r.room_id
         ORDER BY r.floor, r.room_number
     """)
-    return "\n".join(
-        f"Room {r['room_number']} (Floor {r['floor']}): {r['occupied']}/{r['capacity']} occupied" 
-        for r in occupancy
-    )
+    return "\n".join(line for (line,) in occupancy)
 
 @mcp.resource("data://maintenance")
 def get_maintenance(ctx: Context) -> str:
     """Get maintenance request information"""
     db = ctx.request_context.lifespan_context
-    maintenance = db.execute_query("""
-        SELECT m.request_id, r.floor, r.room_number, m.issue_description, m.status, m.reported_date
+    maintenance = db.iter_query_tuples("""
+        SELECT printf('ID: %s, Room: %s (Floor %s), Issue: %s, Status: %s',
+                      m.request_id, r.room_number, r.floor, m.issue_description, m.status)
         FROM maintenance m
         JOIN rooms r ON m.room_id = r.room_id
         ORDER BY m.reported_date DESC
     """)
-    return "\n".join(
-        f"ID: {m['request_id']}, Room: {m['room_number']} (Floor {m['floor']}), " +
-        f"Issue: {m['issue_description']}, Status: {m['status']}"
-        for m in maintenance
-    )
+    return "\n".join(line for (line,) in maintenance)
 
 # Define tools for querying the database
 @mcp.tool()
 def query_database(ctx: Context, sql_query: str) -> str:
     """Execute SQL queries on the dormitory database"""
     # Basic SQL injection prevention
-    forbidden_keywords = ["DROP", "DELETE", "UPDATE", "INSERT", "ALTER", "CREATE"]
-    if any(keyword in sql_query.upper() for keyword in forbidden_keywords):
+    if _FORBIDDEN_RE.search(sql_query):
         return f"Error: Query contains forbidden keywords. Only SELECT queries are allowed."
     
-    if not sql_query.strip().upper().startswith("SELECT"):
+    if not _SELECT_RE.match(sql_query):
         return f"Error: Only SELECT queries are allowed for security reasons."
     
     db = ctx.request_context.lifespan_context
@@ -116,18 +177,12 @@ def query_database(ctx: Context, sql_query: str) -> str:
         if "error" in results[0]:
             return f"Error executing query: {results[0]['error']}"
         
-        keys = results[0].keys()
-        rows = []
-        
         # Header
-        header = " | ".join(keys)
-        separator = "-" * len(header)
-        rows.append(header)
-        rows.append(separator)
+        header = " | ".join(results[0])
+        rows = [header, "-" * len(header)]
         
-        # Data rows
-        for row in results:
-            rows.append(" | ".join(str(row[key]) for key in keys))
+        # Data rows; every row dict shares the header's column order
+        rows.extend(" | ".join(map(str, row.values())) for row in results)
         
         return "\n".join(rows)
     except Exception as e:
@@ -137,13 +192,29 @@ def query_database(ctx: Context, sql_query: str) -> str:
 def find_student(ctx: Context, search_term: str) -> str:
     """Find a student by name or ID"""
     db = ctx.request_context.lifespan_context
-    results = db.execute_query(f"""
-        SELECT s.*, r.floor, r.room_number
-        FROM students s
-        LEFT JOIN occupancy o ON s.student_id = o.student_id AND o.check_out_date IS NULL
-        LEFT JOIN rooms r ON o.room_id = r.room_id
-        WHERE s.student_id LIKE '%{search_term}%' OR s.name LIKE '%{search_term}%'
-    """)
+    results = []
+    # The trigram index can only match terms of at least three characters
+    use_fts = len(search_term.strip()) >= 3
+    if use_fts:
+        results = db.execute_query("""
+            SELECT s.*, r.floor, r.room_number
+            FROM students_fts f
+            JOIN students s ON s.rowid = f.rowid
+            LEFT JOIN occupancy o ON s.student_id = o.student_id AND o.check_out_date IS NULL
+            LEFT JOIN rooms r ON o.room_id = r.room_id
+            WHERE students_fts MATCH ?
+        """, (_fts_substring_query(search_term.strip()),))
+    
+    # Short terms, and databases created before the full-text index existed, use a substring scan
+    if not use_fts or (results and "error" in results[0]):
+        pattern = f"%{search_term}%"
+        results = db.execute_query("""
+            SELECT s.*, r.floor, r.room_number
+            FROM students s
+            LEFT JOIN occupancy o ON s.student_id = o.student_id AND o.check_out_date IS NULL
+            LEFT JOIN rooms r ON o.room_id = r.room_id
+            WHERE s.student_id LIKE ? OR s.name LIKE ?
+        """, (pattern, pattern))
     
     if not results:
         return f"No students found matching '{search_term}'."
@@ -165,14 +236,14 @@ def find_student(ctx: Context, search_term: str) -> str:
 def room_occupants(ctx: Context, floor: int, room_number: str) -> str:
     """List all current occupants of a specific room"""
     db = ctx.request_context.lifespan_context
-    occupants = db.execute_query(f"""
+    occupants = db.execute_query("""
         SELECT s.student_id, s.name, s.program, o.check_in_date
         FROM students s
         JOIN occupancy o ON s.student_id = o.student_id
         JOIN rooms r ON o.room_id = r.room_id
-        WHERE r.floor = {floor} AND r.room_number = '{room_number}'
+        WHERE r.floor = ? AND r.room_number = ?
         AND o.check_out_date IS NULL
-    """)
+    """, (floor, room_number))
     
     if not occupants:
         return f"No current occupants found for Room {room_number} on Floor {floor}."
@@ -197,25 +268,27 @@ def check_availability(ctx: Context) -> str:
     """Check room availability in the dormitory"""
     db = ctx.request_context.lifespan_context
     availability = db.execute_query("""
-        SELECT r.floor, r.room_number, r.capacity, 
-               (SELECT COUNT(*) FROM occupancy o 
-                WHERE o.room_id = r.room_id AND o.check_out_date IS NULL) as occupied,
-               r.capacity - (SELECT COUNT(*) FROM occupancy o 
-                            WHERE o.room_id = r.room_id AND o.check_out_date IS NULL) as available
+        SELECT r.floor, r.room_number, r.capacity,
+               COUNT(o.occupancy_id) as occupied,
+               r.capacity - COUNT(o.occupancy_id) as available
         FROM rooms r
+        LEFT JOIN occupancy o ON o.room_id = r.room_id AND o.check_out_date IS NULL
+        GROUP BY r.room_id
         ORDER BY r.floor, r.room_number
     """)
     
     formatted_results = ["Room Availability:"]
+    current_floor = None
     
-    for floor in range(1, 4):  # 3 floors
-        floor_rooms = [r for r in availability if r['floor'] == floor]
-        formatted_results.append(f"\nFloor {floor}:")
-        formatted_results.append("-" * 40)
+    # Rows arrive sorted by floor, so emit a header whenever the floor changes
+    for room in availability:
+        if room['floor'] != current_floor:
+            current_floor = room['floor']
+            formatted_results.append(f"\nFloor {current_floor}:")
+            formatted_results.append("-" * 40)
         
-        for room in floor_rooms:
-            status = "FULL" if room['available'] == 0 else f"{room['available']} beds available"
-            formatted_results.append(f"Room {room['room_number']}: {room['occupied']}/{room['capacity']} occupied - {status}")
+        status = "FULL" if room['available'] == 0 else f"{room['available']} beds available"
+        formatted_results.append(f"Room {room['room_number']}: {room['occupied']}/{room['capacity']} occupied - {status}")
     
     return "\n".join(formatted_results)
 
@@ -3,168 +3,426 @@ import sqlite3
 import os
 import asyncio
 from sqlite3 import Row
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 import json
 import requests
+import numpy as np
+import pandas as pd
 import time
 import sys
-from sentence_transformers import SentenceTransformer
+import platform
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from sentence_transformers import SentenceTransformer, CrossEncoder, quantize_embeddings
 import chromadb
 from chromadb.utils import embedding_functions
 from mcp import ClientSession, types
 
-# Initialize embedding model
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
+def quantized_onnx_file() -> str:
+    """Pick the int8 ONNX export of MiniLM that matches this CPU's instruction set"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu_flags = f.read()
+    except OSError:
+        cpu_flags = ""
+    if "avx512_vnni" in cpu_flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512f" in cpu_flags:
+        return "onnx/model_qint8_avx512.onnx"
+    return "onnx/model_quint8_avx2.onnx"
 
-# Set up ChromaDB
-chroma_client = chromadb.Client()
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+def cuda_available() -> bool:
+    """Whether PyTorch can see a CUDA device to run the embedder on"""
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
 
-# Create or get collections for different document types
-students_collection = chroma_client.get_or_create_collection(
-    name="students_data",
-    embedding_function=embedding_function
-)
+# Initialize embedding model. With a CUDA GPU this is MiniLM in FP16 on the GPU; otherwise it is
+# the int8-quantized ONNX export run through onnxruntime. EMBEDDING_BACKEND=cuda|onnx|openvino|torch
+# forces a choice: openvino runs the int8-quantized OpenVINO IR export (often faster on Intel CPUs),
+# torch the FP32 PyTorch weights on the CPU.
+# EMBEDDING_ONNX_FILE overrides which ONNX file from the model repository is loaded.
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "cuda" if cuda_available() else "onnx")
+if EMBEDDING_BACKEND == "onnx":
+    embedder = SentenceTransformer(
+        EMBEDDING_MODEL,
+        backend="onnx",
+        model_kwargs={
+            "file_name": os.getenv("EMBEDDING_ONNX_FILE", quantized_onnx_file()),
+            "provider": "CPUExecutionProvider"
+        }
+    )
+elif EMBEDDING_BACKEND == "openvino":
+    embedder = SentenceTransformer(
+        EMBEDDING_MODEL,
+        backend="openvino",
+        model_kwargs={"file_name": "openvino/openvino_model_qint8_quantized.xml"}
+    )
+elif EMBEDDING_BACKEND == "cuda":
+    embedder = SentenceTransformer(EMBEDDING_MODEL, device="cuda")
+    embedder.half()
+else:
+    embedder = SentenceTransformer(EMBEDDING_MODEL)
 
-rooms_collection = chroma_client.get_or_create_collection(
-    name="rooms_data",
-    embedding_function=embedding_function
-)
+# Optional cross-encoder that reorders oversampled vector hits before they go to the LLM.
+# Off by default; USE_RERANKER=1 turns it on
+USE_RERANKER = os.getenv("USE_RERANKER", "0") == "1"
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# How many vector hits per requested chunk the reranker gets to choose from
+RERANK_OVERSAMPLE = 3
 
-occupancy_collection = chroma_client.get_or_create_collection(
-    name="occupancy_data",
-    embedding_function=embedding_function
-)
+# Optional two-stage search: an in-process int8 copy of every vector picks INT8_PREFILTER_OVERSAMPLE x k
+# candidates by integer dot product, then their FP32 vectors are fetched from Chroma for exact rescoring.
+# Off by default; INT8_PREFILTER=1 turns it on
+USE_INT8_PREFILTER = os.getenv("INT8_PREFILTER", "0") == "1"
+INT8_PREFILTER_OVERSAMPLE = 5
 
-maintenance_collection = chroma_client.get_or_create_collection(
-    name="maintenance_data",
-    embedding_function=embedding_function
-)
+# How long Ollama keeps the model loaded after the last request, so follow-up questions skip the reload
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Documents per encode batch during ingestion; larger batches amortize tokenizer and matmul overhead,
+# and a GPU has the memory and parallelism for bigger ones than the CPU backends
+EMBED_BATCH_SIZE = 512 if EMBEDDING_BACKEND == "cuda" else 256
+# Documents per encode-then-insert step of ingestion; kept below Chroma's maximum add batch size
+INGEST_CHUNK_SIZE = 2048
+
+@lru_cache(maxsize=1024)
+def embed_query(query: str) -> tuple:
+    """Embed a user query once; repeated questions in a session skip the model entirely"""
+    return tuple(embedder.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0].tolist())
+
+@embedding_functions.register_embedding_function
+class SharedEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """Chroma embedding function backed by the module-level embedder, so the model is loaded once"""
+    def __init__(self) -> None:
+        # Holds no state of its own; every call goes through the shared embedder
+        pass
+
+    def __call__(self, input):
+        return embedder.encode(list(input), convert_to_numpy=True, normalize_embeddings=True).tolist()
+
+    @staticmethod
+    def name() -> str:
+        return "dorm_shared_minilm"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "SharedEmbeddingFunction":
+        return SharedEmbeddingFunction()
 
-schema_collection = chroma_client.get_or_create_collection(
-    name="schema_data",
-    embedding_function=embedding_function
+# Set up ChromaDB. The vector store is kept on disk so a restart reuses the embeddings from the
+# previous run instead of rebuilding them; CHROMA_PATH moves it elsewhere
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_dorm")
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+embedding_function = SharedEmbeddingFunction()
+
+# A single collection holds every document type; the "type" metadata tag tells them apart.
+# Embeddings are normalized, so cosine distance; the HNSW settings only apply when it is first created
+dorm_collection = chroma_client.get_or_create_collection(
+    name="dormitory_data",
+    embedding_function=embedding_function,
+    configuration={"hnsw": {"space": "cosine", "max_neighbors": 16, "ef_construction": 100, "ef_search": 64}}
 )
 
 class DormitoryRAG:
-    def __init__(self, db_path: str = "dormitory.db", mcp_port: int = 3000):
+    def __init__(
+        self,
+        db_path: str = "dormitory.db",
+        mcp_port: int = 3000,
+        use_reranker: bool = USE_RERANKER,
+        use_int8_prefilter: bool = USE_INT8_PREFILTER
+    ):
         self.db_path = db_path
         self.mcp_port = mcp_port
-        self.ollama_url = "http://localhost:11434/api/generate"
+        self.use_int8_prefilter = use_int8_prefilter
+        # Filled by _load_int8_index: document ids, their "type" tags, int8 vectors and quantization ranges
+        self._int8_ids = None
+        self._int8_doc_types = None
+        self._int8_vectors = None
+        self._int8_ranges = None
+        self.use_reranker = use_reranker
+        self.reranker = (
+            CrossEncoder(RERANKER_MODEL, backend="onnx" if EMBEDDING_BACKEND == "onnx" else "torch")
+            if use_reranker else None
+        )
+        self.ollama_url = "http://localhost:11434/api/chat"
+        self.model = "llama3.2"
+        # Fixed part of every chat request; each call only adds its messages
+        self._payload_template = {"model": self.model, "stream": True, "keep_alive": OLLAMA_KEEP_ALIVE}
         self.context_window_size = 4096
         self.mcp_session = None
-        self.conversation_history = []
         self.max_history_length = 10
+        # Bounded to the last max_history_length exchanges; older turns drop off on append
+        self.conversation_history = deque(maxlen=self.max_history_length * 2)
+        # Keep-alive session so every chat turn reuses the same connection to Ollama
+        self.http = requests.Session()
+        self.http.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.http.headers["Content-Type"] = "application/json"
+        # The collection size only changes in initialize_database, so it is cached here
+        self._collection_count = dorm_collection.count()
+        # ((query, k, doc_types), chunks) for the most recent retrieval, so an immediately repeated question skips the search
+        self._last_context = None
+
+    def warm_up_model(self) -> threading.Thread:
+        """Have Ollama load the model in the background, so it is ready by the time the first question arrives"""
+        def load_model():
+            # A chat request without messages only loads the model; it uses its own connection so it
+            # does not compete with the chat session
+            try:
+                requests.post(
+                    self.ollama_url,
+                    json={"model": self.model, "messages": [], "keep_alive": OLLAMA_KEEP_ALIVE},
+                    timeout=(3, 300)
+                )
+            except requests.RequestException:
+                pass
+
+        thread = threading.Thread(target=load_model, daemon=True)
+        thread.start()
+        return thread
+
+    def _source_stamp(self) -> Dict[str, Any]:
+        """What the vector store is built from: the SQLite database version and the embedder
+
+        Only the main file's mtime is stamped. A passive WAL checkpoint runs first so commits still
+        sitting in the -wal file (e.g. while the MCP server keeps a connection open) reach the main
+        file; the -wal file itself is recreated with a fresh mtime whenever a connection opens it.
+        """
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"{self.db_path} not found; run create_dorm_database.py first")
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        finally:
+            conn.close()
+        return {
+            "source_mtime": os.path.getmtime(self.db_path),
+            "embedding_backend": EMBEDDING_BACKEND,
+            "embedding_model": EMBEDDING_MODEL
+        }
 
     def initialize_database(self) -> None:
+        # The persisted vector store records which database version and embedder it was built with
+        source_stamp = self._source_stamp()
+        stored = dorm_collection.metadata or {}
+        if self._collection_count and all(stored.get(key) == value for key, value in source_stamp.items()):
+            print("Vector store is up to date with the database, skipping ingestion.")
+            if self.use_int8_prefilter:
+                self._load_int8_index()
+            return
+
         print("Initializing database and loading into vector store...")
+        if self._collection_count:
+            dorm_collection.delete(ids=dorm_collection.get(include=[])["ids"])
         conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT sql FROM sqlite_master WHERE type='table'")
-        schema_texts = [row['sql'] for row in cursor.fetchall() if row['sql']]
-        if schema_texts:
-            schema_collection.add(
-                documents=schema_texts,
-                ids=[f"schema_{i}" for i in range(len(schema_texts))],
-                metadatas=[{"type": "schema"} for _ in schema_texts]
+        # Read-side tuning for the one-off full scans below: a 64 MB page cache, memory-mapped I/O
+        # and in-memory temp storage for the joins
+        conn.executescript("""
+            PRAGMA cache_size=-65536;
+            PRAGMA mmap_size=268435456;
+            PRAGMA temp_store=MEMORY;
+        """)
+
+        # Documents from every table go into one collection, embedded together in one pass below.
+        # Each table is loaded into a DataFrame and its texts, ids and metadata are assembled as
+        # whole columns rather than formatted row by row
+        texts, ids, metadatas = [], [], []
+
+        def add_documents(doc_type: str, id_column: pd.Series, doc_texts: pd.Series) -> None:
+            texts.extend(doc_texts.tolist())
+            ids.extend((f"{doc_type}_" + id_column.astype(str)).tolist())
+            metadatas.extend({"type": doc_type, "id": doc_id} for doc_id in id_column.tolist())
+
+        # students_fts* tables only back the MCP server's student search index, and sqlite_* are
+        # SQLite's own (e.g. sqlite_stat1 written by ANALYZE)
+        schema_texts = [
+            sql for (sql,) in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'students_fts%' AND name NOT LIKE 'sqlite_%'"
             )
+            if sql
+        ]
+        texts.extend(schema_texts)
+        ids.extend(f"schema_{i}" for i in range(len(schema_texts)))
+        metadatas.extend({"type": "schema"} for _ in schema_texts)
 
-        cursor.execute("SELECT * FROM students")
-        students = cursor.fetchall()
-        students_texts, students_ids, students_metadata = [], [], []
-        for student in students:
-            d = dict(student)
-            t = f"Student ID: {d['student_id']}, Name: {d['name']}, Gender: {d['gender']}, Program: {d['program']}, Status: {d['status']}"
-            students_texts.append(t)
-            students_ids.append(f"student_{d['student_id']}")
-            students_metadata.append({"type": "student", "id": d['student_id']})
-        if students_texts:
-            students_collection.add(documents=students_texts, ids=students_ids, metadatas=students_metadata)
-
-        cursor.execute("SELECT * FROM rooms")
-        rooms = cursor.fetchall()
-        rooms_texts, rooms_ids, rooms_metadata = [], [], []
-        for room in rooms:
-            d = dict(room)
-            t = f"Room ID: {d['room_id']}, Floor: {d['floor']}, Room Number: {d['room_number']}, Capacity: {d['capacity']}"
-            rooms_texts.append(t)
-            rooms_ids.append(f"room_{d['room_id']}")
-            rooms_metadata.append({"type": "room", "id": d['room_id']})
-        if rooms_texts:
-            rooms_collection.add(documents=rooms_texts, ids=rooms_ids, metadatas=rooms_metadata)
-
-        cursor.execute("""
-            SELECT o.*, s.name as student_name, r.floor, r.room_number
+        df = pd.read_sql_query("SELECT student_id, name, gender, program, status FROM students", conn)
+        add_documents("student", df["student_id"],
+            "Student ID: " + df["student_id"] + ", Name: " + df["name"] + ", Gender: " + df["gender"]
+            + ", Program: " + df["program"] + ", Status: " + df["status"])
+
+        df = pd.read_sql_query("SELECT room_id, floor, room_number, capacity FROM rooms", conn)
+        add_documents("room", df["room_id"],
+            "Room ID: " + df["room_id"].astype(str) + ", Floor: " + df["floor"].astype(str)
+            + ", Room Number: " + df["room_number"] + ", Capacity: " + df["capacity"].astype(str))
+
+        df = pd.read_sql_query("""
+            SELECT o.occupancy_id, o.student_id, o.check_in_date, o.check_out_date,
+                   s.name as student_name, r.floor, r.room_number
             FROM occupancy o
             JOIN students s ON o.student_id = s.student_id
             JOIN rooms r ON o.room_id = r.room_id
-        """)
-        occupancies = cursor.fetchall()
-        occupancy_texts, occupancy_ids, occupancy_metadata = [], [], []
-        for o in occupancies:
-            d = dict(o)
-            status = f"checked out on {d['check_out_date']}" if d['check_out_date'] else "currently residing"
-            t = f"Student {d['student_name']} (ID: {d['student_id']}) checked in to Room {d['room_number']} on Floor {d['floor']} on {d['check_in_date']} and is {status}."
-            occupancy_texts.append(t)
-            occupancy_ids.append(f"occupancy_{d['occupancy_id']}")
-            occupancy_metadata.append({"type": "occupancy", "id": d['occupancy_id']})
-        if occupancy_texts:
-            occupancy_collection.add(documents=occupancy_texts, ids=occupancy_ids, metadatas=occupancy_metadata)
-
-        cursor.execute("""
-            SELECT m.*, r.floor, r.room_number
+        """, conn)
+        status = ("checked out on " + df["check_out_date"]).where(df["check_out_date"].notna(), "currently residing")
+        add_documents("occupancy", df["occupancy_id"],
+            "Student " + df["student_name"] + " (ID: " + df["student_id"] + ") checked in to Room "
+            + df["room_number"] + " on Floor " + df["floor"].astype(str) + " on " + df["check_in_date"]
+            + " and is " + status + ".")
+
+        df = pd.read_sql_query("""
+            SELECT m.request_id, m.issue_description, m.reported_date, m.status, m.resolved_date,
+                   r.floor, r.room_number
             FROM maintenance m
             JOIN rooms r ON m.room_id = r.room_id
-        """)
-        maintenance_requests = cursor.fetchall()
-        maintenance_texts, maintenance_ids, maintenance_metadata = [], [], []
-        for m in maintenance_requests:
-            d = dict(m)
-            status = f"resolved on {d['resolved_date']}" if d['resolved_date'] else f"status: {d['status']}"
-            t = f"Maintenance request #{d['request_id']} for Room {d['room_number']} on Floor {d['floor']}: {d['issue_description']}. Reported on {d['reported_date']}, {status}."
-            maintenance_texts.append(t)
-            maintenance_ids.append(f"maintenance_{d['request_id']}")
-            maintenance_metadata.append({"type": "maintenance", "id": d['request_id']})
-        if maintenance_texts:
-            maintenance_collection.add(documents=maintenance_texts, ids=maintenance_ids, metadatas=maintenance_metadata)
+        """, conn)
+        status = ("resolved on " + df["resolved_date"]).where(df["resolved_date"].notna(), "status: " + df["status"])
+        add_documents("maintenance", df["request_id"],
+            "Maintenance request #" + df["request_id"].astype(str) + " for Room " + df["room_number"]
+            + " on Floor " + df["floor"].astype(str) + ": " + df["issue_description"]
+            + ". Reported on " + df["reported_date"] + ", " + status + ".")
 
         conn.close()
+
+        # Encode in chunks and hand each chunk to a single worker thread for the Chroma insert,
+        # so the next chunk is being embedded while the previous one is written to the index
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            pending = []
+            for start in range(0, len(texts), INGEST_CHUNK_SIZE):
+                end = start + INGEST_CHUNK_SIZE
+                vectors = embedder.encode(
+                    texts[start:end],
+                    batch_size=EMBED_BATCH_SIZE,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+                pending.append(writer.submit(
+                    dorm_collection.add,
+                    documents=texts[start:end],
+                    ids=ids[start:end],
+                    metadatas=metadatas[start:end],
+                    # float32 ndarray straight through; FP16 (CUDA) output is widened here
+                    embeddings=vectors.astype(np.float32, copy=False)
+                ))
+            for future in pending:
+                future.result()
+        dorm_collection.modify(metadata=source_stamp)
+        self._collection_count = dorm_collection.count()
+        self._last_context = None
+        if self.use_int8_prefilter:
+            self._load_int8_index()
+
         print("Database loaded into vector store successfully!")
 
-    def query_ollama(self, prompt: str, context: Optional[str] = None) -> str:
+    def query_ollama(self, prompt: str, context: Optional[str] = None) -> Iterator[str]:
+        """Stream the model's reply token by token; the full reply is added to the history once it ends"""
         system_message = "You are a helpful assistant for a dormitory management system. Answer questions based on the provided context."
         if context:
             system_message += "\n\nContext information:\n" + context
-        if len(self.conversation_history) >= self.max_history_length * 2:
-            self.conversation_history = self.conversation_history[2:]
+        # Evict the oldest whole exchange first; letting the bounded deque drop only its user
+        # message would leave an orphan assistant reply right after the system prompt
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            self.conversation_history.popleft()
+            self.conversation_history.popleft()
         self.conversation_history.append({"role": "user", "content": prompt})
-        messages = [{"role": "system", "content": system_message}] + self.conversation_history
-        payload = {"model": "llama3.2", "messages": messages, "stream": False}
+
+        messages = [{"role": "system", "content": system_message}] + list(self.conversation_history)
+        # Compact separators keep the request body, which repeats the whole history each turn, small
+        body = json.dumps({**self._payload_template, "messages": messages}, separators=(",", ":")).encode()
+        reply_parts = []
         try:
-            response = requests.post("http://localhost:11434/api/chat", json=payload)
-            response.raise_for_status()
-            result = response.json()
-            reply = result.get("message", {}).get("content", "I couldn't generate a response.")
-            self.conversation_history.append({"role": "assistant", "content": reply})
-            return reply
+            with self.http.post(self.ollama_url, data=body, stream=True, timeout=(3, 120)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(chunk["error"])
+                    token = chunk.get("message", {}).get("content", "")
+                    if token:
+                        reply_parts.append(token)
+                        yield token
+                    if chunk.get("done"):
+                        break
         except Exception as e:
-            return f"Error querying Ollama: {str(e)}"
+            # Drop the unanswered turn so the bounded history keeps whole user/assistant pairs
+            self.conversation_history.pop()
+            yield f"Error querying Ollama: {str(e)}"
+            return
+        if not reply_parts:
+            reply = "I couldn't generate a response."
+            self.conversation_history.append({"role": "assistant", "content": reply})
+            yield reply
+            return
+        reply = "".join(reply_parts)
+        self.conversation_history.append({"role": "assistant", "content": reply})
 
-    def query_vector_store(self, query: str, k: int = 5) -> List[str]:
-        results = []
-        for collection in [students_collection, rooms_collection, occupancy_collection, maintenance_collection, schema_collection]:
-            try:
-                collection_results = collection.query(
-                    query_texts=[query],
-                    n_results=min(k, collection.count())
+    def _load_int8_index(self) -> None:
+        """Quantize every stored vector to int8 for the prefilter; the FP32 vectors stay in Chroma"""
+        stored = dorm_collection.get(include=["embeddings", "metadatas"])
+        vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+        if not len(vectors):
+            self._int8_vectors = None
+            return
+        self._int8_ranges = np.vstack((vectors.min(axis=0), vectors.max(axis=0)))
+        self._int8_vectors = quantize_embeddings(vectors, precision="int8", ranges=self._int8_ranges)
+        self._int8_ids = np.array(stored["ids"])
+        self._int8_doc_types = np.array([(metadata or {}).get("type") for metadata in stored["metadatas"]])
+
+    def _int8_search(self, query_embedding: np.ndarray, n_results: int, doc_types: Optional[List[str]]) -> List[str]:
+        """Pick candidates by int8 dot product, then return the n_results best by FP32 similarity"""
+        rows = np.flatnonzero(np.isin(self._int8_doc_types, doc_types)) if doc_types else np.arange(len(self._int8_ids))
+        n_candidates = min(n_results * INT8_PREFILTER_OVERSAMPLE, len(rows))
+        if n_candidates == 0:
+            return []
+        query_int8 = quantize_embeddings(query_embedding[None, :], precision="int8", ranges=self._int8_ranges)[0]
+        scores = np.matmul(self._int8_vectors[rows], query_int8, dtype=np.int32)
+        candidate_ids = self._int8_ids[rows[np.argpartition(-scores, n_candidates - 1)[:n_candidates]]]
+
+        candidates = dorm_collection.get(ids=candidate_ids.tolist(), include=["embeddings", "documents"])
+        similarity = np.asarray(candidates["embeddings"], dtype=np.float32) @ query_embedding
+        return [candidates["documents"][i] for i in np.argsort(-similarity)[:n_results]]
+
+    def query_vector_store(self, query: str, k: int = 5, doc_types: Optional[List[str]] = None) -> List[str]:
+        """Return the k chunks closest to the query, optionally limited to some document types
+
+        doc_types takes the "type" metadata values: schema, student, room, occupancy, maintenance.
+        The filter is for programmatic callers; the CLI always searches every type.
+        """
+        # With the reranker on, fetch extra candidates and let it pick the best k
+        n_results = min(k * RERANK_OVERSAMPLE if self.use_reranker else k, self._collection_count)
+        if n_results == 0:
+            return []
+        cache_key = (query, k, tuple(doc_types) if doc_types else None)
+        if self._last_context is not None and self._last_context[0] == cache_key:
+            return list(self._last_context[1])
+        try:
+            if self.use_int8_prefilter and self._int8_vectors is not None:
+                chunks = self._int8_search(np.asarray(embed_query(query), dtype=np.float32), n_results, doc_types)
+            else:
+                results = dorm_collection.query(
+                    query_embeddings=[list(embed_query(query))],
+                    n_results=n_results,
+                    where={"type": {"$in": list(doc_types)}} if doc_types else None
                 )
-                docs = collection_results.get("documents", [[]])[0]
-                results.extend(docs)
-            except Exception as e:
-                print(f"Error querying collection: {e}")
-        return results[:k]
+                chunks = results.get("documents", [[]])[0]
+            if self.use_reranker and len(chunks) > k:
+                scores = self.reranker.predict([(query, chunk) for chunk in chunks], batch_size=64)
+                chunks = [chunks[i] for i in scores.argsort()[::-1][:k]]
+            self._last_context = (cache_key, chunks)
+            return list(chunks)
+        except Exception as e:
+            print(f"Error querying collection: {e}")
+            return []
 
     def run_cli(self):
         print("=== Dormitory RAG System ===")
@@ -176,10 +434,15 @@ class DormitoryRAG:
                 break
             context_chunks = self.query_vector_store(user_input, k=5)
             combined_context = "\n".join(context_chunks)
-            response = self.query_ollama(user_input, context=combined_context)
-            print("\nResponse:\n", response)
+            # Print tokens as they stream in so the answer starts appearing before it is finished
+            print("\nResponse:\n", end=" ")
+            for token in self.query_ollama(user_input, context=combined_context):
+                print(token, end="", flush=True)
+            print()
 
 if __name__ == "__main__":
     rag = DormitoryRAG()
+    # Loading the LLM and embedding the database overlap instead of running back to back
+    rag.warm_up_model()
     rag.initialize_database()
     rag.run_cli()
@@ -21,7 +21,7 @@ if [ ! -d "venv" ]; then
     echo -e "${YELLOW}Virtual environment not found. Setting up environment...${NC}"
     python3 -m venv venv
     source venv/bin/activate
-    pip install mcp-api langchain sentence-transformers fastmcp chromadb pandas requests
+    pip install mcp-api langchain "sentence-transformers[onnx]" fastmcp chromadb pandas numpy requests
 else
     source venv/bin/activate
 fi
@@ -35,9 +35,17 @@ fi
 # Check if Ollama is running
 if ! curl -s http://localhost:11434/api/version &> /dev/null; then
     echo -e "${YELLOW}Starting Ollama service...${NC}"
-    ollama serve &
-    # Wait for Ollama to start
-    sleep 5
+    # Log to a file rather than the terminal so server output does not interleave with the chat
+    ollama serve > ollama.log 2>&1 &
+    # Wait until the API answers (up to 30 seconds) instead of a fixed delay
+    for _ in $(seq 1 60); do
+        curl -s http://localhost:11434/api/version &> /dev/null && break
+        sleep 0.5
+    done
+    if ! curl -s http://localhost:11434/api/version &> /dev/null; then
+        echo -e "${RED}Error: Ollama did not start. See ollama.log for details.${NC}"
+        exit 1
+    fi
 fi
 
 # Check if Llama 3.2 model is available